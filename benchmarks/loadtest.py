@@ -0,0 +1,388 @@
+"""Load test of a VaultBackend
+
+Spawns reader and writer processes, each running a number of threads,
+against a shared VaultBackend. Readers only load the vault. Writers
+perform a mix of loads and read-modify-write increments of a counter
+entry, with keys drawn from a uniform or Zipf distribution.
+
+Every increment a writer completes is counted locally, so comparing
+those counts with the counters left in the vault afterwards shows how
+many updates were lost to concurrent writes. If the vault cannot be loaded
+after the run, it is reported as corrupted and every increment is lost.
+
+The load test replaces the contents of <vaultfile> with counter entries,
+so it refuses to run against an existing file unless --overwrite is
+given. Without <vaultfile> it runs against a temporary file.
+
+Usage:
+  loadtest.py [options] [<vaultfile>]
+
+Options:
+  -h --help                Show this screen.
+  --backend=<factory>      Backend factory as module:callable taking the vault path [default: pbkdvault.vault:VaultBackendFile].
+  --readers=<n>            Reader processes [default: 2].
+  --writers=<n>            Writer processes [default: 2].
+  --threads=<n>            Threads per process [default: 2].
+  --ops=<n>                Operations per thread [default: 200].
+  --duration=<s>           Seconds each thread runs, instead of --ops when above 0 [default: 0].
+  --read-ratio=<r>         Fraction of writer operations that are reads [default: 0.5].
+  --keys=<n>               Number of distinct entries [default: 100].
+  --distribution=<dist>    Key distribution, uniform or zipf [default: uniform].
+  --zipf-s=<s>             Exponent of the Zipf distribution [default: 1.1].
+  --seed=<n>               Random seed [default: 0].
+  --startup-timeout=<s>    Seconds to wait for all workers to start [default: 30].
+  --start-method=<method>  Start method of the worker processes, fork, spawn or forkserver.
+  --overwrite              Replace the contents of an existing <vaultfile>.
+"""
+import collections
+import dataclasses
+import importlib
+import itertools
+import math
+import multiprocessing
+import pathlib
+import queue
+import random
+import tempfile
+import threading
+import time
+from multiprocessing.process import BaseProcess
+from multiprocessing.synchronize import Barrier
+from typing import Any, Callable, Optional
+from docopt import docopt, DocoptExit
+from pbkdvault.vault import VaultBackend, VaultEntries
+
+BackendFactory = Callable[[pathlib.Path], VaultBackend]
+
+DISTRIBUTIONS = ("uniform", "zipf")
+RESULT_POLL = 1.0  # Seconds
+
+
+@dataclasses.dataclass
+class LoadConfig:
+    """Configuration of a load test run
+    """
+    path: pathlib.Path
+    backend: str
+    readers: int
+    writers: int
+    threads: int
+    ops: int
+    duration: float
+    read_ratio: float
+    keys: int
+    distribution: str
+    zipf_s: float
+    seed: int
+    overwrite: bool = False
+    startup_timeout: float = 30.0
+    start_method: Optional[str] = None
+
+
+@dataclasses.dataclass
+class WorkerResult:
+    """Result of a single worker process
+    """
+    reads: list[float] = dataclasses.field(default_factory=list)
+    writes: list[float] = dataclasses.field(default_factory=list)
+    failed_reads: list[float] = dataclasses.field(default_factory=list)
+    failed_writes: list[float] = dataclasses.field(default_factory=list)
+    errors: collections.Counter = dataclasses.field(default_factory=collections.Counter)
+    increments: collections.Counter = dataclasses.field(default_factory=collections.Counter)
+    elapsed: float = 0.0
+
+    def merge(self, other: "WorkerResult"):
+        """Add the measurements of other to this result"""
+        self.reads.extend(other.reads)
+        self.writes.extend(other.writes)
+        self.failed_reads.extend(other.failed_reads)
+        self.failed_writes.extend(other.failed_writes)
+        self.errors.update(other.errors)
+        self.increments.update(other.increments)
+        self.elapsed = max(self.elapsed, other.elapsed)
+
+
+def validate(config: LoadConfig):
+    """Check that config describes a load that can be run
+
+    Args:
+        config (LoadConfig): the load to check
+
+    Raises:
+        ValueError: If the config is invalid
+    """
+    if config.distribution not in DISTRIBUTIONS:
+        raise ValueError(f"unknown distribution: {config.distribution}")
+    if config.keys <= 0:
+        raise ValueError("keys must be above 0")
+    if config.readers < 0 or config.writers < 0 or config.readers + config.writers == 0:
+        raise ValueError("at least one reader or writer is needed")
+    if config.threads <= 0:
+        raise ValueError("threads must be above 0")
+    if config.start_method is not None and config.start_method not in multiprocessing.get_all_start_methods():
+        raise ValueError(f"unsupported start method: {config.start_method}")
+    if config.startup_timeout <= 0:
+        raise ValueError("startup timeout must be above 0")
+    if config.ops < 0 or config.duration < 0:
+        raise ValueError("ops and duration must not be negative")
+    if not 0 <= config.read_ratio <= 1:
+        raise ValueError("read ratio must be between 0 and 1")
+
+
+def load_factory(spec: str) -> BackendFactory:
+    """Import a backend factory given as module:callable
+
+    Args:
+        spec (str): the factory, eg. pbkdvault.vault:VaultBackendFile
+
+    Raises:
+        ValueError: If spec is not on the form module:callable
+
+    Returns:
+        BackendFactory: callable that creates a backend from a path
+    """
+    module_name, sep, attr = spec.partition(":")
+    if not sep:
+        raise ValueError(f"invalid backend factory: {spec}")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def key_chooser(config: LoadConfig, rng: random.Random) -> Callable[[], str]:
+    """Make a function that draws keys from the configured distribution"""
+    keys = [f"key{i}" for i in range(config.keys)]
+    if config.distribution == "uniform":
+        return lambda: rng.choice(keys)
+    if config.distribution == "zipf":
+        cum_weights = list(itertools.accumulate(1 / (rank ** config.zipf_s) for rank in range(1, config.keys + 1)))
+        return lambda: rng.choices(keys, cum_weights=cum_weights)[0]
+    raise ValueError(f"unknown distribution: {config.distribution}")
+
+
+def read(backend: VaultBackend, key: str):
+    """Load the vault and look up key"""
+    backend.load().get(key)
+
+
+def increment(backend: VaultBackend, key: str):
+    """Load the vault, increment the counter of key and save it"""
+    entries: VaultEntries = backend.load()
+    entry = entries.setdefault(key, {'count': 0})
+    entry['count'] += 1
+    backend.save(entries)
+
+
+def run_thread(config: LoadConfig, writer: bool, seed: int, barrier: Barrier, result: WorkerResult, lock: threading.Lock):
+    """Run the operations of a single thread once all threads are ready, and add them to result"""
+    local = WorkerResult()
+    try:
+        backend = load_factory(config.backend)(config.path)
+        rng = random.Random(seed)
+        choose = key_chooser(config, rng)
+    except Exception as err:  # pylint: disable=broad-except
+        local.errors[f"setup: {type(err).__name__}"] += 1
+        barrier.abort()
+    try:
+        barrier.wait()
+    except threading.BrokenBarrierError:
+        if not local.errors:
+            local.errors["startup: BrokenBarrierError"] += 1
+        with lock:
+            result.merge(local)
+        return
+    started = time.perf_counter()
+    deadline = started + config.duration
+    ops = 0
+    while time.perf_counter() < deadline if config.duration > 0 else ops < config.ops:
+        ops += 1
+        key = choose()
+        is_write = writer and rng.random() >= config.read_ratio
+        start = time.perf_counter()
+        try:
+            if is_write:
+                increment(backend, key)
+            else:
+                read(backend, key)
+        except Exception as err:  # pylint: disable=broad-except
+            elapsed = time.perf_counter() - start
+            local.errors[f"{'write' if is_write else 'read'}: {type(err).__name__}"] += 1
+            (local.failed_writes if is_write else local.failed_reads).append(elapsed)
+            continue
+        elapsed = time.perf_counter() - start
+        if is_write:
+            local.writes.append(elapsed)
+            local.increments[key] += 1
+        else:
+            local.reads.append(elapsed)
+    local.elapsed = time.perf_counter() - started
+    with lock:
+        result.merge(local)
+
+
+def run_process(config: LoadConfig, writer: bool, seed: int, barrier: Barrier, results: multiprocessing.Queue):
+    """Run the threads of a single process, and put the result on results"""
+    result = WorkerResult()
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=run_thread, args=(config, writer, seed * config.threads + i, barrier, result, lock))
+        for i in range(config.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put(result)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of values"""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+@dataclasses.dataclass
+class LoadReport:
+    """Outcome of a load test run
+    """
+    result: WorkerResult
+    elapsed: float
+    lost: int
+    corrupted: Optional[str] = None
+
+
+def count_lost(increments: collections.Counter, stored: VaultEntries) -> int:
+    """Count the completed increments that are missing from the stored counters
+
+    Args:
+        increments (collections.Counter): completed increments per key
+        stored (VaultEntries): the vault after the load test
+
+    Returns:
+        int: the number of lost updates
+    """
+    return sum(count - stored.get(key, {}).get('count', 0) for key, count in increments.items())
+
+
+def collect(processes: list[BaseProcess], results: multiprocessing.Queue) -> WorkerResult:
+    """Collect the results of processes, without waiting for processes that died
+
+    Args:
+        processes (list[BaseProcess]): the started worker processes
+        results (multiprocessing.Queue): the queue the workers put their result on
+
+    Returns:
+        WorkerResult: the combined result, with an error for each worker that failed
+    """
+    total = WorkerResult()
+    received = 0
+    exited = False
+    while received < len(processes):
+        try:
+            total.merge(results.get(timeout=RESULT_POLL))
+            received += 1
+        except queue.Empty:
+            if exited:
+                break
+            exited = not any(process.is_alive() for process in processes)
+    for process in processes:
+        process.join()
+        if process.exitcode != 0:
+            total.errors[f"worker: exit code {process.exitcode}"] += 1
+    return total
+
+
+def run(config: LoadConfig) -> LoadReport:
+    """Run a load test
+
+    Args:
+        config (LoadConfig): the load to generate
+
+    Raises:
+        ValueError: If the config is invalid
+        FileExistsError: If the vault exists and config.overwrite is not set
+
+    Returns:
+        LoadReport: the combined result, the elapsed time, and the number of lost updates
+    """
+    validate(config)
+    if config.path.exists() and not config.overwrite:
+        raise FileExistsError(f"{config.path} exists, use --overwrite to replace its contents")
+    factory = load_factory(config.backend)
+    factory(config.path).save({})
+    roles = [False] * config.readers + [True] * config.writers
+    context = multiprocessing.get_context(config.start_method)
+    barrier = context.Barrier(len(roles) * config.threads, timeout=config.startup_timeout)
+    results: multiprocessing.Queue = context.Queue()
+    processes = [
+        context.Process(target=run_process, args=(config, writer, config.seed + i, barrier, results))
+        for i, writer in enumerate(roles)
+    ]
+    for process in processes:
+        process.start()
+    total = collect(processes, results)
+    elapsed = total.elapsed
+    try:
+        stored = factory(config.path).load()
+    except Exception as err:  # pylint: disable=broad-except
+        return LoadReport(total, elapsed, sum(total.increments.values()), f"{type(err).__name__}: {err}")
+    return LoadReport(total, elapsed, count_lost(total.increments, stored))
+
+
+def report(load: LoadReport):
+    """Print a summary of a load test"""
+    result, elapsed = load.result, load.elapsed
+    print(f"{'op':>12} {'count':>8} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    rows = (("read", result.reads), ("write", result.writes),
+            ("failed read", result.failed_reads), ("failed write", result.failed_writes))
+    for name, values in rows:
+        rate = len(values) / elapsed if elapsed > 0 else 0.0
+        print(f"{name:>12} {len(values):>8} {rate:>10.1f} "
+              f"{percentile(values, 50) * 1000:>9.3f} {percentile(values, 99) * 1000:>9.3f}")
+    print(f"elapsed: {elapsed:.3f}s")
+    print(f"errors: {sum(result.errors.values())}")
+    for error, count in sorted(result.errors.items()):
+        print(f"  {error}: {count}")
+    if load.corrupted is not None:
+        print(f"vault corrupted: {load.corrupted}")
+    print(f"lost updates: {load.lost} of {sum(result.increments.values())}")
+
+
+def make_config(args: dict[str, Any], path: pathlib.Path) -> LoadConfig:
+    """Create a LoadConfig from the parsed arguments"""
+    return LoadConfig(
+        path=path,
+        backend=args["--backend"],
+        readers=int(args["--readers"]),
+        writers=int(args["--writers"]),
+        threads=int(args["--threads"]),
+        ops=int(args["--ops"]),
+        duration=float(args["--duration"]),
+        read_ratio=float(args["--read-ratio"]),
+        keys=int(args["--keys"]),
+        distribution=args["--distribution"],
+        zipf_s=float(args["--zipf-s"]),
+        seed=int(args["--seed"]),
+        overwrite=args["--overwrite"],
+        startup_timeout=float(args["--startup-timeout"]),
+        start_method=args["--start-method"],
+    )
+
+
+def main():
+    """Parse arguments, run the load test and print the report"""
+    args = docopt(__doc__)
+    vaultfile: Optional[str] = args["<vaultfile>"]
+    try:
+        if vaultfile is not None:
+            report(run(make_config(args, pathlib.Path(vaultfile))))
+            return
+        with tempfile.TemporaryDirectory() as tmppath:
+            report(run(make_config(args, pathlib.Path(tmppath, "vault.db"))))
+    except (ValueError, FileExistsError) as err:
+        raise DocoptExit(str(err)) from err
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@
 Usage:
   pbkdvault [-k <keyfile>] genkey
   pbkdvault [-k <keyfile> -f <vaultfile>] init
-  pbkdvault [-k <keyfile> -f <vaultfile>] add <name> [<password>] <secret>
+  pbkdvault [-k <keyfile> -f <vaultfile> -c <method> -t <bytes>] add <name> [<password>] <secret>
   pbkdvault [-k <keyfile> -f <vaultfile>] get <name> [<password>]
 
 Options:
@@ -11,11 +11,14 @@ Options:
   --version               Show version.
   -f, --vaultfile=<file>  Vaultfile [default: vault.db].
   -k, --keyfile=<file>    Keyfile [default: vault.key].
+  -c, --compression=<method>  Compress large secrets with zlib or lzma.
+  -t, --compression-threshold=<bytes>  Smallest secret in bytes that is compressed.
 
 """
 import pathlib
 from typing import Any
-from docopt import docopt
+from docopt import docopt, DocoptExit
+from . import compress
 from . import keyfile
 from . import vault
 
@@ -48,8 +51,17 @@ def cmd_init(args: dict[str, Any]):
 
 def cmd_add(args: dict[str, Any]):
     """Action to add secret to vaultfile"""
+    compression = args["--compression"]
+    if compression is not None and compression not in compress.COMPRESSORS:
+        raise DocoptExit(f"--compression must be one of: {', '.join(compress.COMPRESSORS)}")
+    threshold = args["--compression-threshold"]
+    if threshold is None:
+        threshold = compress.DEFAULT_COMPRESSION_THRESHOLD
+    elif not threshold.isdigit():
+        raise DocoptExit("--compression-threshold must be a non-negative number of bytes")
     key = keyfile.load(pathlib.Path(args["--keyfile"]))
-    vaultfile = vault.open_vault(key, pathlib.Path(args["--vaultfile"]))
+    vaultfile = vault.open_vault(key, pathlib.Path(args["--vaultfile"]), compression=compression,
+                                 compression_threshold=int(threshold))
     vaultfile.store(args["<name>"], args["<password>"], args["<secret>"])
 
 def cmd_get(args: dict[str, Any]):
@@ -0,0 +1,67 @@
+"""
+Module to compress and decompress entries before they are encrypted
+
+A compressed entry is prefixed with a single byte naming the method. The
+prefix bytes can never start valid UTF-8, so entries stored as plain
+UTF-8 text are told apart from compressed ones, and the prefix is
+encrypted and authenticated together with the rest of the entry.
+"""
+import lzma
+import zlib
+from typing import Callable, Optional
+
+# Bytes. The zlib crossover reported by benchmarks/compression.py for PEM and
+# JSON key file entries: from here the vault file shrinks by at least 10%,
+# while decompression adds under 1% to a retrive
+DEFAULT_COMPRESSION_THRESHOLD = 256
+
+COMPRESSORS: dict[str, tuple[bytes, Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    'zlib': (b'\xfe', zlib.compress, zlib.decompress),
+    'lzma': (b'\xfd', lzma.compress, lzma.decompress),
+}
+
+DECOMPRESSORS: dict[bytes, Callable[[bytes], bytes]] = {
+    prefix: decompressor for prefix, _, decompressor in COMPRESSORS.values()
+}
+
+
+def compress(method: Optional[str], data: bytes, threshold: int = DEFAULT_COMPRESSION_THRESHOLD) -> bytes:
+    """Compress data with method, if it is large enough and gets smaller
+
+    Args:
+        method (Optional[str]): name of the compressor, None disables compression
+        data (bytes): UTF-8 encoded data to compress
+        threshold (int, optional): minimum size of data before it is compressed
+
+    Raises:
+        ValueError: If the method is unknown
+
+    Returns:
+        bytes: the compressed data with its prefix, or data if it was not compressed
+    """
+    if method is None:
+        return data
+    if method not in COMPRESSORS:
+        raise ValueError(f"unknown compression method: {method}")
+    if len(data) < threshold:
+        return data
+    prefix, compressor, _ = COMPRESSORS[method]
+    compressed = prefix + compressor(data)
+    if len(compressed) >= len(data):
+        return data
+    return compressed
+
+
+def decompress(data: bytes) -> bytes:
+    """Decompress data created by compress
+
+    Args:
+        data (bytes): prefixed compressed data, or UTF-8 encoded data
+
+    Returns:
+        bytes: decompressed data
+    """
+    decompressor = DECOMPRESSORS.get(data[:1])
+    if decompressor is None:
+        return data
+    return decompressor(data[1:])
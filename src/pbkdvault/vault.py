@@ -4,9 +4,10 @@ import pathlib
 import logging
 import json
 import dataclasses
-from typing import Any, Union, Protocol
+from typing import Any, Optional, Union, Protocol
 from . import securefile
 from . import b64
+from . import compress
 from .cipher import Cipher, DEFAULT_CIPHER
 from .keycipher import KeyCipher
 
@@ -65,9 +66,17 @@ class Vault:
     keycipher: KeyCipher
     backend: VaultBackend
     persist: bool = True
-    cipher: Cipher = DEFAULT_CIPHER
+    cipher: Cipher = dataclasses.field(default_factory=lambda: DEFAULT_CIPHER)
+    compression: Optional[str] = None
+    compression_threshold: int = compress.DEFAULT_COMPRESSION_THRESHOLD
     entries: VaultEntries = dataclasses.field(default_factory=dict, init=False)
 
+    def __post_init__(self):
+        if self.compression is not None and self.compression not in compress.COMPRESSORS:
+            raise ValueError(f"unknown compression method: {self.compression}")
+        if self.compression_threshold < 0:
+            raise ValueError("compression threshold must not be negative")
+
     def save(self):
         """Save the vault in the backend
         """
@@ -98,10 +107,11 @@ class Vault:
         packet = entry['packet']
         key = self.keycipher.get_key(passphrase, salt)
         msg = self.cipher.decrypt(key, packet)
-        return msg
+        return compress.decompress(msg)
 
     def _encrypt(self, passphrase: str, msg: bytes) -> VaultEntry:
         key, salt = self.keycipher.make_key(passphrase)
+        msg = compress.compress(self.compression, msg, self.compression_threshold)
         entry = {
             'salt': b64.encode(salt),
             'packet': self.cipher.encrypt(key, msg)
@@ -134,33 +144,41 @@ class Vault:
         self._set(entry_id, encrypted_entry)
 
 
-def create_vault(master_key: bytes, vault_file: pathlib.Path, persist: bool = True) -> Vault:
+def create_vault(master_key: bytes, vault_file: pathlib.Path, persist: bool = True, compression: Optional[str] = None,
+                 compression_threshold: int = compress.DEFAULT_COMPRESSION_THRESHOLD) -> Vault:
     """Create a file vault
 
     Args:
         master_key (bytes): Master key to encrypt the entries
         vault_file (pathlib.Path): Path to file the vault should be saved in
         persist (bool, optional): Load and save on all changes. Defaults to True.
+        compression (Optional[str], optional): Compress large entries with 'zlib' or 'lzma'. Defaults to None.
+        compression_threshold (int, optional): Smallest entry in bytes that is compressed. Defaults to DEFAULT_COMPRESSION_THRESHOLD.
 
     Returns:
         Vault: The newly created vault
     """
-    vault = Vault(KeyCipher(master_key), VaultBackendFile(vault_file), persist=persist)
+    vault = Vault(KeyCipher(master_key), VaultBackendFile(vault_file), persist=persist,
+                  compression=compression, compression_threshold=compression_threshold)
     vault.save()
     return vault
 
 
-def open_vault(master_key: bytes, vault_file: pathlib.Path, persist: bool = True) -> Vault:
+def open_vault(master_key: bytes, vault_file: pathlib.Path, persist: bool = True, compression: Optional[str] = None,
+               compression_threshold: int = compress.DEFAULT_COMPRESSION_THRESHOLD) -> Vault:
     """Load an existing vault
 
     Args:
         master_key (bytes): Master key to encrypt and decrypt the entries
         vault_file (pathlib.Path): Path to the vault file
         persist (bool, optional): Load and save on all changes. Defaults to True.
+        compression (Optional[str], optional): Compress large new entries with 'zlib' or 'lzma'. Defaults to None.
+        compression_threshold (int, optional): Smallest entry in bytes that is compressed. Defaults to DEFAULT_COMPRESSION_THRESHOLD.
 
     Returns:
         Vault: The loaded vault
     """
-    vault = Vault(KeyCipher(master_key), VaultBackendFile(vault_file), persist=persist)
+    vault = Vault(KeyCipher(master_key), VaultBackendFile(vault_file), persist=persist,
+                  compression=compression, compression_threshold=compression_threshold)
     vault.load()
     return vault
@@ -0,0 +1,43 @@
+import pytest
+from pbkdvault import compress
+
+
+messages = [
+        b"",
+        b"a",
+        b"a" * 2048,
+        "æøå".encode('utf-8') * 512,
+    ]
+
+
+@pytest.mark.parametrize('message', messages)
+@pytest.mark.parametrize('method', [None, 'zlib', 'lzma'])
+def test_roundtrip(method, message: bytes):
+    data = compress.compress(method, message, threshold=0)
+    assert compress.decompress(data) == message
+
+
+@pytest.mark.parametrize('method', ['zlib', 'lzma'])
+def test_prefix(method):
+    message = b"a" * 2048
+    data = compress.compress(method, message, threshold=0)
+    assert data[:1] == compress.COMPRESSORS[method][0]
+    with pytest.raises(UnicodeDecodeError):
+        data.decode('utf-8')
+
+
+def test_threshold():
+    message = b"a" * 100
+    assert compress.compress('zlib', message, threshold=101) == message
+    data = compress.compress('zlib', message, threshold=100)
+    assert len(data) < len(message)
+
+
+def test_incompressible():
+    message = b"ab"
+    assert compress.compress('lzma', message, threshold=0) == message
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        compress.compress('gzip', b"")
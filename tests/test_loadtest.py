@@ -0,0 +1,116 @@
+import collections
+import math
+import multiprocessing
+import os
+import pathlib
+import random
+import pytest
+import loadtest
+from pbkdvault.vault import VaultBackendFile
+
+START_METHODS = multiprocessing.get_all_start_methods()
+
+
+def make_config(**kwargs):
+    values = dict(path=pathlib.Path("vault.db"), backend="pbkdvault.vault:VaultBackendFile", readers=0, writers=1,
+                  threads=1, ops=1, duration=0, read_ratio=0.5, keys=10, distribution="uniform", zipf_s=1.1, seed=0)
+    values.update(kwargs)
+    return loadtest.LoadConfig(**values)
+
+
+@pytest.mark.parametrize('pct,want', [(0, 1), (20, 1), (21, 2), (50, 3), (99, 5), (100, 5)])
+def test_percentile(pct, want):
+    assert loadtest.percentile([5, 3, 1, 4, 2], pct) == want
+
+
+def test_percentile_empty():
+    assert math.isnan(loadtest.percentile([], 50))
+
+
+def test_key_chooser_uniform():
+    choose = loadtest.key_chooser(make_config(keys=3), random.Random(0))
+    counts = collections.Counter(choose() for _ in range(3000))
+    assert set(counts) == {"key0", "key1", "key2"}
+    assert min(counts.values()) > 800
+
+
+def test_key_chooser_zipf():
+    choose = loadtest.key_chooser(make_config(keys=10, distribution="zipf", zipf_s=1.5), random.Random(0))
+    counts = collections.Counter(choose() for _ in range(5000))
+    assert counts["key0"] > counts["key1"] > counts["key9"]
+
+
+def test_key_chooser_unknown():
+    with pytest.raises(ValueError):
+        loadtest.key_chooser(make_config(distribution="normal"), random.Random(0))
+
+
+def test_count_lost():
+    increments = collections.Counter({"key0": 5, "key1": 3, "key2": 2})
+    stored = {"key0": {'count': 5}, "key1": {'count': 1}}
+    assert loadtest.count_lost(increments, stored) == 4
+
+
+@pytest.mark.parametrize('start_method', START_METHODS)
+def test_run(tmp_path, start_method):
+    load = loadtest.run(make_config(path=tmp_path / "vault.db", threads=1, ops=20, read_ratio=0,
+                                    start_method=start_method))
+    assert len(load.result.writes) == 20
+    assert sum(load.result.increments.values()) == 20
+    assert load.corrupted is None
+    assert load.lost == 0
+    assert load.elapsed > 0
+
+
+@pytest.mark.parametrize('kwargs', [
+    dict(distribution="normal"),
+    dict(keys=0),
+    dict(readers=0, writers=0),
+    dict(threads=0),
+    dict(ops=-1),
+    dict(read_ratio=1.5),
+    dict(read_ratio=-0.1),
+    dict(start_method="thread"),
+])
+def test_validate(kwargs):
+    with pytest.raises(ValueError):
+        loadtest.validate(make_config(**kwargs))
+
+
+def test_report_without_elapsed(capsys):
+    loadtest.report(loadtest.LoadReport(loadtest.WorkerResult(), 0.0, 0))
+    assert "elapsed: 0.000s" in capsys.readouterr().out
+
+
+def test_run_existing_vault(tmp_path):
+    path = tmp_path / "vault.db"
+    path.write_text('{"secret": {}}')
+    with pytest.raises(FileExistsError):
+        loadtest.run(make_config(path=path))
+    assert path.read_text() == '{"secret": {}}'
+
+
+def exiting_backend(path):
+    if multiprocessing.parent_process() is not None:
+        os._exit(3)
+    return VaultBackendFile(path)
+
+
+def raising_backend(path):
+    if multiprocessing.parent_process() is not None:
+        raise RuntimeError("backend unavailable")
+    return VaultBackendFile(path)
+
+
+@pytest.mark.parametrize('start_method', START_METHODS)
+def test_run_worker_exits(tmp_path, start_method):
+    load = loadtest.run(make_config(path=tmp_path / "vault.db", backend="test_loadtest:exiting_backend",
+                                    readers=1, writers=1, startup_timeout=5, start_method=start_method))
+    assert load.result.errors["worker: exit code 3"] == 2
+
+
+def test_run_worker_setup_fails(tmp_path):
+    load = loadtest.run(make_config(path=tmp_path / "vault.db", backend="test_loadtest:raising_backend",
+                                    threads=2, startup_timeout=5))
+    assert load.result.errors["setup: RuntimeError"] == 2
+    assert load.elapsed == 0
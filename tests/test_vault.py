@@ -2,6 +2,8 @@ import pytest
 import tempfile
 import pathlib
 from pbkdvault import vault
+from pbkdvault import b64
+
 
 def test_vault():
     with tempfile.TemporaryDirectory() as tmppath:
@@ -12,4 +14,68 @@ def test_vault():
         v1.store("entry", "pass", want)
         v2 = vault.open_vault(key, path)
         got = v2.retrive("entry", "pass")
-        assert want == got
\ No newline at end of file
+        assert want == got
+
+
+@pytest.mark.parametrize('compression', ['zlib', 'lzma'])
+def test_vault_compression(compression):
+    with tempfile.TemporaryDirectory() as tmppath:
+        key = bytes(512 // 8)
+        path = pathlib.Path(tmppath, "db")
+        v1 = vault.create_vault(key, path, compression=compression)
+        small, large = "secret", "secret\n" * 1024
+        v1.store("small", "pass", small)
+        v1.store("large", "pass", large)
+        assert len(v1.entries["large"]['packet']['ciphertext']) < len(large)
+        v2 = vault.open_vault(key, path)
+        assert v2.retrive("small", "pass") == small
+        assert v2.retrive("large", "pass") == large
+
+
+def test_vault_uncompressed_entry():
+    with tempfile.TemporaryDirectory() as tmppath:
+        key = bytes(512 // 8)
+        path = pathlib.Path(tmppath, "db")
+        v1 = vault.create_vault(key, path)
+        want = "secret\n" * 1024
+        v1.store("entry", "pass", want)
+        v2 = vault.open_vault(key, path, compression='zlib')
+        assert v2.retrive("entry", "pass") == want
+
+
+def test_vault_compression_authenticated():
+    with tempfile.TemporaryDirectory() as tmppath:
+        key = bytes(512 // 8)
+        path = pathlib.Path(tmppath, "db")
+        v1 = vault.create_vault(key, path, compression='zlib')
+        v1.store("entry", "pass", "secret\n" * 1024)
+        packet = v1.entries["entry"]['packet']
+        raw = bytearray(b64.decode(packet['ciphertext']))
+        raw[0] ^= 1
+        packet['ciphertext'] = b64.encode(bytes(raw))
+        v1.save()
+        with pytest.raises(ValueError):
+            vault.open_vault(key, path).retrive("entry", "pass")
+
+
+def test_vault_compression_threshold():
+    with tempfile.TemporaryDirectory() as tmppath:
+        key = bytes(512 // 8)
+        path = pathlib.Path(tmppath, "db")
+        entry = "secret\n" * 64
+        v1 = vault.create_vault(key, path, compression='zlib', compression_threshold=len(entry) + 1)
+        v1.store("entry", "pass", entry)
+        assert len(b64.decode(v1.entries["entry"]['packet']['ciphertext'])) == len(entry)
+        v2 = vault.open_vault(key, path, compression='zlib', compression_threshold=len(entry))
+        v2.store("entry", "pass", entry)
+        assert len(b64.decode(v2.entries["entry"]['packet']['ciphertext'])) < len(entry)
+
+
+def test_vault_invalid_compression():
+    with tempfile.TemporaryDirectory() as tmppath:
+        key = bytes(512 // 8)
+        path = pathlib.Path(tmppath, "db")
+        with pytest.raises(ValueError):
+            vault.create_vault(key, path, compression='gzip')
+        with pytest.raises(ValueError):
+            vault.create_vault(key, path, compression='zlib', compression_threshold=-1)